@@ -29,11 +29,15 @@ from __future__ import print_function
 import argparse
 import fnmatch
 import glob
+import hashlib
+import json
 import multiprocessing
 import os
 import os.path
 import shutil
+import subprocess
 import sys
+import tempfile
 
 import sdk
 
@@ -43,10 +47,23 @@ import sdk
 
 HERE = os.path.abspath(os.path.dirname(__file__))
 HOME = os.path.expanduser('~')
+CACHE_DIR = os.path.join(HERE, '_cache')
 PYQT_LICENSE_FILE = os.path.join(HERE, 'pyqt-commercial.sip')
 QT_LICENSE_FILE = os.path.join(HERE, 'qt-license.txt')
 SUPPORT_DIR = os.path.join(HERE, 'support')
 EXECUTABLE_EXT = ".exe" if sys.platform == 'win32' else ""
+BENCHMARK_SCRIPT = os.path.join(SUPPORT_DIR, 'sdk-benchmark.py')
+INSTALL_PROGRAM_SCRIPT = os.path.join(SUPPORT_DIR, 'install-program.sh')
+INSTALL_STAMPS_DIR = os.path.join(CACHE_DIR, 'install-stamps')
+STRIP_PROGRAM_SCRIPT = os.path.join(SUPPORT_DIR, 'strip-program.sh')
+PGO_DIR = os.path.join(CACHE_DIR, 'pgo')
+PGO_TRAINING_SCRIPT = os.path.join(SUPPORT_DIR, 'pyqt-benchmark.py')
+STATIC_PYTHON_DIR = os.path.join(SUPPORT_DIR, 'static-python')
+STATIC_PYTHON_EXE = 'python-pyqt' + EXECUTABLE_EXT
+BENCHMARK_RUNS = 5
+BENCHMARK_THRESHOLD = 1.5
+BENCHMARK_TIME_TOLERANCE = 0.010       # seconds
+BENCHMARK_MEMORY_TOLERANCE = 4096      # KiB
 
 
 def check_bash():
@@ -71,12 +88,16 @@ def main():
     add_to_plan(plan, 'sip', build_sip, args.with_sip_sources)
     add_to_plan(plan, 'pyqt', build_pyqt, args.with_pyqt_sources)
 
+    if args.static:
+        add_to_plan(plan, 'python', build_static_python, STATIC_PYTHON_DIR)
+
     # If user specified some packages on the command line, build only those
     if args.packages != 'all':
         plan = [entry for entry in plan if entry[0] in args.packages]
 
     # Get this installation's layout
-    layout = sdk.get_layout(sdk.platform_root(args.install_root))
+    build_type = 'static' if args.static else 'dynamic'
+    layout = sdk.get_layout(sdk.platform_root(args.install_root, build_type))
 
     # Setup build environment
     prep(layout)
@@ -96,11 +117,23 @@ def main():
         install_scripts(args.install_root)
         return
 
+    # --only-benchmark stops the build here.
+    if args.only_benchmark:
+        benchmark(layout, args.profile)
+        return
+
     # Build
-    build(plan, layout, args.debug, args.profile)
+    build(plan, layout, args.debug, args.profile, args.static)
     merge(layout)
+
+    if not args.no_dedupe:
+        dedupe(layout)
+
     install_scripts(args.install_root)
 
+    if not args.no_benchmark:
+        benchmark(layout, args.profile)
+
 
 def parse_command_line():
     args_parser = argparse.ArgumentParser()
@@ -120,7 +153,13 @@ def parse_command_line():
         else:
             argparse.ArgumentTypeError("%r not found, provide an existing folder" % glob_pattern)
 
+    args_parser.add_argument(
+        '-b', '--only-benchmark', action='store_true', help="Skip build step, benchmark the SDK only")
+    args_parser.add_argument(
+        '-B', '--no-benchmark', action='store_true', help="Don't benchmark the SDK after the build")
     args_parser.add_argument('-d', '--debug', action='store_true')
+    args_parser.add_argument(
+        '--no-dedupe', action='store_true', help="Don't hardlink identical files in the SDK")
     args_parser.add_argument(
         '-k', '--shell', action='store_true', help="starts a shell just before starting the build")
     args_parser.add_argument(
@@ -132,10 +171,12 @@ def parse_command_line():
     args_parser.add_argument('-r', '--install-root', help="default: %(default)s", type=sdk.mkdir,
                              default=os.path.join(HERE, '_out'))
     args_parser.add_argument('-c', '--with-icu-sources',  type=sdk.adir)
+    args_parser.add_argument('-S', '--static', action='store_true',
+                             help="Build static libraries and a Python interpreter linked to them")
     args_parser.add_argument('-t', '--with-pyqt-sources', type=sdk.adir)
     args_parser.add_argument('-q', '--with-qt-sources',   type=sdk.adir)
     args_parser.add_argument('-s', '--with-sip-sources',  type=sdk.adir)
-    args_parser.add_argument('packages', metavar='PACKAGES', nargs='*', choices=['sip', 'qt', 'pyqt', 'icu', 'all'],
+    args_parser.add_argument('packages', metavar='PACKAGES', nargs='*', choices=['sip', 'qt', 'pyqt', 'icu', 'python', 'all'],
                              default='all', help="Build only selected packages from {%(choices)s}, default: %(default)s")
 
     args = args_parser.parse_args()
@@ -161,6 +202,10 @@ def parse_command_line():
         if not args.profile:
             sdk.die('I need a profile in to rebuild Qt!')
 
+    # Static libraries with LTO objects need the compiler's ar plugin (gcc-ar), we don't set it up.
+    if args.static and args.profile and args.profile.get('optimize', {}).get('lto'):
+        sdk.die('LTO is not supported in static builds, remove "lto" from the profile.')
+
     return args
 
 
@@ -177,12 +222,58 @@ def make_install_root_skel(layout):
             os.makedirs(path)
 
 
-def build(recipes, layout, debug, profile):
+def build(recipes, layout, debug, profile, static):
+    if is_pgo_enabled(profile):
+        if os.path.isdir(PGO_DIR):
+            shutil.rmtree(PGO_DIR)
+
+        sdk.print_box('PGO 1/2: instrumented build')
+        run_recipes(recipes, layout, debug, dict(profile, pgo_stage='generate'), static)
+        pgo_train(layout, profile)
+
+        # ICU isn't instrumented, there is no need to rebuild it.
+        recipes = [recipe for recipe in recipes if recipe[0] != 'icu']
+        clean(recipes)
+
+        sdk.print_box('PGO 2/2: optimized build')
+        run_recipes(recipes, layout, debug, dict(profile, pgo_stage='use'), static)
+    else:
+        run_recipes(recipes, layout, debug, profile, static)
+
+    # Don't leak our optimization flags into applications built with the SDK.
+    installed_conf = os.path.join(layout['root'], 'mkspecs', 'common', 'gcc-base.conf')
+    if os.path.isfile(installed_conf):
+        set_mkspec_flags(installed_conf, [], [])
+
+
+def run_recipes(recipes, layout, debug, profile, static):
     for pkg, build_f, src_dir in recipes:
         sdk.print_box('Building %s' % pkg, src_dir)
 
         with sdk.chdir(src_dir):
-            build_f(layout, debug, profile)
+            build_f(layout, debug, profile, static)
+
+
+def clean(recipes):
+    for _, _, src_dir in recipes:
+        with sdk.chdir(src_dir):
+            if os.path.isfile('Makefile'):
+                make('clean')
+
+
+def pgo_train(layout, profile):
+    env = os.environ.copy()
+    env['QT_QPA_PLATFORM'] = 'offscreen'
+
+    python = sdk_python(layout)
+    training = profile['optimize']['pgo'].get('training', [PGO_TRAINING_SCRIPT])
+
+    for script in training:
+        sdk.print_box('PGO training', script)
+        try:
+            subprocess.check_call([python, os.path.join(HERE, script)], env=env)
+        except subprocess.CalledProcessError as err:
+            sdk.die('ERROR: PGO training %s failed with exit status %d' % (script, err.returncode))
 
 
 def merge(layout):
@@ -203,25 +294,190 @@ def install_scripts(install_root):
         os.path.join(HERE, 'configure.py'), os.path.join(install_root, 'configure.py'))
     shutil.copyfile(os.path.join(HERE, 'sdk.py'), os.path.join(install_root, 'sdk.py'))
 
+
+def dedupe(layout):
+    """Replaces byte-identical files under the installation root with hardlinks."""
+    sdk.print_box('Deduplicating files in', layout['root'])
+
+    # Only files with the same size (and permissions) can be identical, don't hash the others.
+    by_size = {}
+    inodes = set()
+    for root, _, filenames in os.walk(layout['root']):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if os.path.islink(path):
+                continue
+
+            # Skip files already hardlinked by a previous run (st_ino is always 0 on Windows).
+            st = os.stat(path)
+            if st.st_ino:
+                if (st.st_dev, st.st_ino) in inodes:
+                    continue
+                inodes.add((st.st_dev, st.st_ino))
+
+            if st.st_size > 0:
+                by_size.setdefault((st.st_size, st.st_mode), []).append(path)
+
+    # candidates :: ((size, mode), path)
+    candidates = [(key, path) for key, paths in by_size.items() if len(paths) > 1 for path in paths]
+
+    pool = multiprocessing.Pool()
+    try:
+        digests = pool.map(hash_file, [path for _, path in candidates], chunksize=16)
+    finally:
+        pool.close()
+        pool.join()
+
+    by_digest = {}
+    for ((size, mode), path), digest in zip(candidates, digests):
+        by_digest.setdefault((size, mode, digest), []).append(path)
+
+    saved = 0
+    linked = 0
+    for (size, _, _), paths in by_digest.items():
+        paths.sort()
+        original = paths[0]
+
+        for duplicate in paths[1:]:
+            # Link under a temporary name first, so we never lose the duplicate if linking fails
+            # (e.g.: too many links to the original).
+            tmp_link = duplicate + '.dedupe'
+            try:
+                hardlink(original, tmp_link)
+            except OSError as err:
+                print('WARNING: unable to hardlink %s to %s: %s' % (duplicate, original, err))
+                continue
+
+            if sys.platform == 'win32':
+                # os.rename() doesn't replace existing files on Windows
+                os.remove(duplicate)
+            os.rename(tmp_link, duplicate)
+
+            saved += size
+            linked += 1
+
+    print('Replaced %d duplicate files with hardlinks, saved %.1f MiB.' %
+          (linked, saved / (1024.0 * 1024.0)))
+
+
+def hash_file(path):
+    digest = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def hardlink(source, link_name):
+    if sys.platform == 'win32':
+        # Python 2.7 has no os.link() on Windows
+        import ctypes
+
+        if not ctypes.windll.kernel32.CreateHardLinkW(unicode(link_name), unicode(source), None):
+            raise ctypes.WinError()
+    else:
+        os.link(source, link_name)
+
+
+def benchmark(layout, profile):
+    """Times the startup of a PyQt application inside the SDK environment and compares the results
+    with the baseline stored in the profile, aborting if we got slower than the threshold.
+
+    The baseline lives in the profile, per platform:
+
+        "benchmark": {
+            "threshold": 1.5,
+            "baseline": {"linux2": {"import_qtcore": 0.05, "max_rss_kib": 30000, ...}}
+        }
+
+    """
+    if os.path.isdir(os.path.join(layout['python'], 'PyQt5')):
+        pyqt = 'PyQt5'
+    elif os.path.isdir(os.path.join(layout['python'], 'PyQt4')):
+        pyqt = 'PyQt4'
+    else:
+        print('PyQt not found, skipping benchmark.')
+        return
+
+    python = sdk_python(layout)
+
+    sdk.print_box('Benchmarking %s startup' % pyqt, '(median of %d runs)' % BENCHMARK_RUNS)
+
+    # prep() has already set up the SDK environment for us.
+    env = os.environ.copy()
+    env['QT_QPA_PLATFORM'] = 'offscreen'
+
+    runs = []
+    for _ in range(BENCHMARK_RUNS):
+        try:
+            output = subprocess.check_output([python, BENCHMARK_SCRIPT, pyqt], env=env)
+        except subprocess.CalledProcessError as err:
+            sdk.die(err.output, 'ERROR: benchmark failed with exit status %d' % err.returncode)
+        runs.append(json.loads(output.splitlines()[-1]))
+
+    results = {}
+    for metric in runs[0]:
+        values = sorted(run[metric] for run in runs)
+        results[metric] = values[len(values) // 2]
+
+    benchmark_profile = profile.get('benchmark', {}) if profile else {}
+    baseline = benchmark_profile.get('baseline', {}).get(sys.platform, {})
+    threshold = benchmark_profile.get('threshold', BENCHMARK_THRESHOLD)
+
+    failures = []
+    for metric in sorted(results):
+        if metric in baseline:
+            ratio = float(results[metric]) / baseline[metric] if baseline[metric] else 1.0
+            print('%-20s %12.4f  (baseline %.4f, x%.2f)' %
+                  (metric, results[metric], baseline[metric], ratio))
+
+            # Timings of a few milliseconds are mostly noise: ignore small absolute differences.
+            if metric == 'max_rss_kib':
+                tolerance = BENCHMARK_MEMORY_TOLERANCE
+            else:
+                tolerance = BENCHMARK_TIME_TOLERANCE
+
+            if ratio > threshold and results[metric] - baseline[metric] > tolerance:
+                failures.append(metric)
+        else:
+            print('%-20s %12.4f  (no baseline)' % (metric, results[metric]))
+
+    if not baseline:
+        print('')
+        print('No baseline for %s in the profile, add this to record one:' % sys.platform)
+        print(json.dumps({sys.platform: results}, indent=4, sort_keys=True))
+
+    if failures:
+        sdk.die('ERROR: SDK is more than x%.2f slower/bigger than the baseline in: %s' %
+                (threshold, ', '.join(failures)))
+
 #
 # Build recipes
-# Function prototype: def f(layout, debug, profile) :: dict -> bool -> dict
+# Function prototype: def f(layout, debug, profile, static) :: dict -> bool -> dict -> bool
+#
+# During PGO builds, profile['pgo_stage'] is either 'generate' or 'use'.
 #
 
-def build_icu(layout, debug, profile):
+def build_icu(layout, debug, profile, static):
     # NOTE: We always build ICU in release mode since we don't usually need to debug it.
     os.chdir('source')
 
+    icu_configure_args = ['--disable-debug', '--enable-release']
+    if static:
+        icu_configure_args.extend(['--enable-static', '--disable-shared'])
+
     if sys.platform == 'darwin':
         sdk.sh('chmod', '+x', 'configure', 'runConfigureICU')
-        sdk.sh('bash', 'runConfigureICU', 'MacOSX', '--prefix=%s' %
-               layout['root'], '--disable-debug', '--enable-release')
+        sdk.sh('bash', 'runConfigureICU', 'MacOSX', '--prefix=%s' % layout['root'],
+               *icu_configure_args)
         sdk.sh('make')
         sdk.sh('make', 'install')
     elif sys.platform == 'linux2':
         sdk.sh('chmod', '+x', 'configure', 'runConfigureICU')
-        sdk.sh('bash', 'runConfigureICU', 'Linux', '--prefix=%s' %
-               layout['root'], '--disable-debug', '--enable-release')
+        sdk.sh('bash', 'runConfigureICU', 'Linux', '--prefix=%s' % layout['root'],
+               *icu_configure_args)
         sdk.sh('make')
         sdk.sh('make', 'install')
     elif sys.platform == 'win32':
@@ -229,23 +485,15 @@ def build_icu(layout, debug, profile):
         cy_install_root = layout['root'].replace('\\', '/')
         cy_install_root = cy_install_root.replace('C:/', '/cygdrive/c/')
 
-        sdk.sh('bash', 'runConfigureICU', 'Cygwin/MSVC', '--prefix=%s' %
-               cy_install_root, '--disable-debug', '--enable-release')
+        sdk.sh('bash', 'runConfigureICU', 'Cygwin/MSVC', '--prefix=%s' % cy_install_root,
+               *icu_configure_args)
         sdk.sh('bash', '-c', 'make')  # We have to use GNU make here, so no make() wrapper...
         sdk.sh('bash', '-c', 'make install')
     else:
         sdk.die('You have to rebuild ICU only on OS X or Windows')
 
 
-def build_qt(layout, debug, profile):
-
-    def qtmake(*args):
-        try:
-            sdk.sh('jom', '/VERSION')
-        except:
-            make(*args)
-        else:
-            sdk.sh('jom', '-j%s' % str(multiprocessing.cpu_count() + 1), *args)
+def build_qt(layout, debug, profile, static):
 
     if os.path.isfile(QT_LICENSE_FILE):
         qt_license = '-commercial'
@@ -265,7 +513,7 @@ def build_qt(layout, debug, profile):
     qt_configure_args = [
         '-confirm-license',
         '-prefix', layout['root'],
-        '-shared',
+        '-static' if static else '-shared',
         qt_license
     ]
 
@@ -289,6 +537,15 @@ def build_qt(layout, debug, profile):
     else:
         qt_configure_args.append('-release')
 
+    # LTO and PGO
+    cflags, lflags = optimization_flags(profile)
+    if sys.platform == 'win32':
+        if cflags:
+            qt_configure_args.append('-ltcg')
+    else:
+        mkspecs_dir = os.path.join('qtbase', 'mkspecs') if is_qt5() else 'mkspecs'
+        set_mkspec_flags(os.path.join(mkspecs_dir, 'common', 'gcc-base.conf'), cflags, lflags)
+
     # Have the compiler find our local copy of ICU
     if sys.platform == 'darwin' or sys.platform == 'win32':
         qt_configure_args.extend(['-I', os.path.join(layout['root'], 'include')])
@@ -319,7 +576,7 @@ def build_qt(layout, debug, profile):
     # Build
     configure_qt(*qt_configure_args)
     qtmake()
-    qtmake('install')
+    qtmake('install', *qmake_install_args())
 
     # Delete all libtool's .la files
     for root, _, filenames in os.walk(layout['root']):
@@ -327,7 +584,7 @@ def build_qt(layout, debug, profile):
             os.remove(os.path.join(root, filename))
 
 
-def build_sip(layout, debug, profile):
+def build_sip(layout, debug, profile, static):
     configure_args = [
         '--bindir', layout['bin'],
         '--destdir', layout['python'],
@@ -335,20 +592,24 @@ def build_sip(layout, debug, profile):
         '--sipdir', layout['sip'],
     ]
 
+    if static:
+        configure_args.append('--static')
+
     set_pyqt_debug_flags(debug, configure_args)
+    set_sip_optimization_flags(profile, configure_args)
 
     configure(*configure_args)
     make()
     make('install')
 
 
-def build_pyqt(layout, debug, profile):
+def build_pyqt(layout, debug, profile, static):
     if os.path.isfile(PYQT_LICENSE_FILE):
         shutil.copyfile(PYQT_LICENSE_FILE, os.path.join('sip', 'pyqt-commercial.sip'))
 
     # Configure-ng
     configure_ng_args = [
-        '--assume-shared',
+        '--static' if static else '--assume-shared',
         '--bindir', layout['bin'],
         '--concatenate',
         '--concatenate-split=4',
@@ -361,21 +622,312 @@ def build_pyqt(layout, debug, profile):
         '--sipdir', layout['sip'],
         '--verbose',
     ]
-    if 'pyqt' in profile and 'common' in profile['pyqt']:
+    if profile and 'pyqt' in profile and 'common' in profile['pyqt']:
         configure_ng_args += profile['pyqt']['common']
 
     set_pyqt_debug_flags(debug, configure_ng_args)
 
+    # PyQt is built by the SDK qmake: on Windows it gets LTO from Qt's own configuration.
+    if sys.platform != 'win32':
+        cflags, lflags = optimization_flags(profile)
+        installed_conf = os.path.join(layout['root'], 'mkspecs', 'common', 'gcc-base.conf')
+        if cflags or lflags or os.path.isfile(installed_conf):
+            set_mkspec_flags(installed_conf, cflags, lflags)
+
     # Build
     configure_ng(*configure_ng_args)
+    sip_sources_key = restore_or_cache_sip_sources(layout, profile, configure_ng_args)
     make()
-    make('install')
+    write_sip_sources_stamp(sip_sources_key)
+    qtmake('install', *qmake_install_args())
+
+
+def build_static_python(layout, debug, profile, static):
+    # Find the static PyQt modules
+    pyqt = 'PyQt5' if os.path.isdir(os.path.join(layout['python'], 'PyQt5')) else 'PyQt4'
+    pyqt_dir = os.path.join(layout['python'], pyqt)
+    lib_pattern = '*.lib' if sys.platform == 'win32' else 'lib*.a'
+    lib_prefix = '' if sys.platform == 'win32' else 'lib'
+
+    modules = []
+    for filename in sorted(fnmatch.filter(os.listdir(pyqt_dir), lib_pattern)):
+        modules.append(os.path.splitext(filename)[0][len(lib_prefix):])
+
+    if not modules:
+        sdk.die('ERROR: no static PyQt modules found in %s' % pyqt_dir)
+
+    # Static libraries must be given in dependency order to the GNU linker, a group is simpler.
+    pyqt_libs = ['-L%s' % pyqt_dir] + ['-l%s' % module for module in modules]
+    pyqt_libs += ['-L%s' % layout['python'], '-lsip']
+    if sys.platform == 'linux2':
+        pyqt_libs = ['-Wl,--start-group'] + pyqt_libs + ['-Wl,--end-group']
+
+    pyqt_qt = []
+    for module in modules:
+        qt_module = pyqt_to_qt_module(module)
+        if qt_module:
+            pyqt_qt.append(qt_module)
+
+    # Python
+    from distutils import sysconfig
+
+    if sys.platform == 'win32':
+        python_libs = ['-L%s' % os.path.join(sys.prefix, 'libs'),
+                       '-lpython%s%s' % sys.version_info[:2]]
+    else:
+        python_libs = ['-L%s' % sysconfig.get_config_var('LIBPL'),
+                       '-lpython%s.%s' % sys.version_info[:2]]
+        for var in ('LIBS', 'SYSLIBS', 'LINKFORSHARED'):
+            python_libs.extend((sysconfig.get_config_var(var) or '').split())
+
+    build_dir = tempfile.mkdtemp(prefix='static-python-')
+    try:
+        with sdk.chdir(build_dir):
+            with open('pyqt_inittab.h', 'w') as inittab:
+                inittab.write('// Generated by build.py, do not edit.\n\n')
+                inittab.write('PyMODINIT_FUNC initsip(void);\n')
+                for module in modules:
+                    inittab.write('PyMODINIT_FUNC init%s(void);\n' % module)
+
+                inittab.write('\nstatic struct _inittab pyqt_inittab[] = {\n')
+                inittab.write('    {(char *)"sip", initsip},\n')
+                for module in modules:
+                    inittab.write('    {(char *)"%s.%s", init%s},\n' % (pyqt, module, module))
+                inittab.write('    {NULL, NULL}\n};\n')
+
+            sdk.sh(os.path.join(layout['bin'], 'qmake' + EXECUTABLE_EXT),
+                   'PYQT_QT=%s' % ' '.join(pyqt_qt),
+                   'PYQT_LIBS=%s' % ' '.join(pyqt_libs),
+                   'PYTHON_INC=%s' % sysconfig.get_python_inc(),
+                   'PYTHON_LIBS=%s' % ' '.join(python_libs),
+                   os.path.join(STATIC_PYTHON_DIR, 'python-pyqt.pro'))
+            make()
+
+            shutil.copy(STATIC_PYTHON_EXE, os.path.join(layout['bin'], STATIC_PYTHON_EXE))
+    finally:
+        shutil.rmtree(build_dir)
+
+
+# PyQt modules whose Qt module isn't named after them
+QT_MODULE_NAMES = {
+    'Enginio': 'enginio',
+    'QAxContainer': 'axcontainer',
+    'QtTest': 'testlib',
+}
+
+
+def pyqt_to_qt_module(module):
+    """Returns the name to use in qmake's QT variable for a PyQt module, or None if the module doesn't
+    wrap a Qt module of its own."""
+    if module in QT_MODULE_NAMES:
+        return QT_MODULE_NAMES[module]
+
+    # Qt (the PyQt 4 all-in-one module) and _QOpenGLFunctions_* (part of QtGui) wrap no module.
+    if module == 'Qt' or module.startswith('_'):
+        return None
+
+    if module.startswith('Qt'):
+        return module[2:].lower()
+
+    sdk.die('ERROR: unable to find the Qt module wrapped by the PyQt module %s' % module)
+
+#
+# SIP generated sources cache
+#
+
+SIP_GENERATED_PATTERNS = ('sip*.c', 'sip*.cpp', 'sip*.h')
+SIP_SOURCES_STAMP = '.sip-sources-key'
+
+
+def restore_or_cache_sip_sources(layout, profile, configure_ng_args):
+    """Keeps the C++ sources generated by sip stable across PyQt rebuilds.
+
+    configure-ng.py always regenerates the sources, so every file looks new to make. If we have
+    already seen the same inputs and the objects in the tree were compiled from them, we put back
+    the cached copies (with their original timestamps) so that make and the compiler cache can skip
+    unchanged work. Otherwise we cache the fresh ones.
+
+    Returns the key, to be written with write_sip_sources_stamp() once the build succeeds.
+
+    """
+    key = sip_sources_key(layout, profile, configure_ng_args)
+    cache_dir = os.path.join(CACHE_DIR, 'sip-sources', key)
+
+    # Until the build succeeds, we don't know what the objects were compiled from.
+    compiled_key = None
+    if os.path.isfile(SIP_SOURCES_STAMP):
+        with open(SIP_SOURCES_STAMP) as stamp:
+            compiled_key = stamp.read().strip()
+        os.remove(SIP_SOURCES_STAMP)
+
+    if os.path.isdir(cache_dir):
+        if compiled_key == key:
+            print('SIP sources cache hit: %s' % key)
+
+            for relpath in find_sip_sources(cache_dir):
+                shutil.copy2(os.path.join(cache_dir, relpath), relpath)
+        else:
+            # Old timestamps would make the objects of another configuration look up to date.
+            print('SIP sources cache hit: %s, but the tree was built with %s' % (key, compiled_key))
+    else:
+        print('SIP sources cache miss: %s' % key)
+
+        tmp_dir = cache_dir + '.tmp'
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+        for relpath in find_sip_sources('.'):
+            dest = os.path.join(tmp_dir, relpath)
+            if not os.path.isdir(os.path.dirname(dest)):
+                os.makedirs(os.path.dirname(dest))
+            shutil.copy2(relpath, dest)
+
+        if os.path.isdir(tmp_dir):
+            os.rename(tmp_dir, cache_dir)
+
+    return key
+
+
+def write_sip_sources_stamp(key):
+    with open(SIP_SOURCES_STAMP, 'w') as stamp:
+        stamp.write(key + '\n')
+
+
+def sip_sources_key(layout, profile, configure_ng_args):
+    """Hashes everything that affects the output of sip: its version, the .sip inputs, the PyQt
+    flags and the Qt configuration, plus the optimization flags PyQt is compiled with."""
+    digest = hashlib.sha1()
+
+    sip_exe = os.path.join(layout['bin'], 'sip' + EXECUTABLE_EXT)
+    digest.update(subprocess.check_output([sip_exe, '-V']))
+
+    for root, dirnames, filenames in os.walk('sip'):
+        dirnames.sort()
+        for filename in sorted(fnmatch.filter(filenames, '*.sip')):
+            path = os.path.join(root, filename)
+            digest.update(path.replace('\\', '/'))
+            with open(path, 'rb') as sip_file:
+                digest.update(sip_file.read())
+
+    digest.update(repr(configure_ng_args))
+    digest.update(repr((profile or {}).get('qt')))
+
+    # PyQt gets these through the installed mkspecs, not from configure_ng_args: objects built
+    # with different flags must not look up to date.
+    digest.update(repr(optimization_flags(profile)))
+
+    qmake_exe = os.path.join(layout['bin'], 'qmake' + EXECUTABLE_EXT)
+    digest.update(subprocess.check_output([qmake_exe, '-query']))
+
+    qconfig = os.path.join(layout['root'], 'mkspecs', 'qconfig.pri')
+    if os.path.isfile(qconfig):
+        with open(qconfig, 'rb') as qconfig_file:
+            digest.update(qconfig_file.read())
+
+    return digest.hexdigest()
+
+
+def find_sip_sources(top):
+    """Yields the paths, relative to top, of the sources generated by sip."""
+    for root, dirnames, filenames in os.walk(top):
+        if root == top and 'sip' in dirnames:
+            dirnames.remove('sip')  # .sip inputs, not generated files
+
+        for pattern in SIP_GENERATED_PATTERNS:
+            for filename in fnmatch.filter(filenames, pattern):
+                yield os.path.relpath(os.path.join(root, filename), top)
+
+#
+# Link-time and profile-guided optimization
+#
+
+MKSPEC_FLAGS_BEGIN = '# BEGIN qt-pyqt-sdk-builder optimization flags\n'
+MKSPEC_FLAGS_END = '# END qt-pyqt-sdk-builder optimization flags\n'
+
+
+def is_pgo_enabled(profile):
+    if not profile or not profile.get('optimize', {}).get('pgo'):
+        return False
+
+    # Only GCC's -fprofile-generate/-fprofile-use flow is supported.
+    if sys.platform != 'linux2':
+        print('WARNING: PGO is only supported on Linux, building with LTO only.')
+        return False
+
+    return True
+
+
+def optimization_flags(profile):
+    """Returns the (compiler flags, linker flags) needed by the optimizations in the profile."""
+    optimize = (profile or {}).get('optimize', {})
+    cflags = []
+    lflags = []
+
+    if optimize.get('lto'):
+        if sys.platform == 'win32':
+            cflags.append('/GL')
+            lflags.append('/LTCG')
+        else:
+            cflags.append('-flto')
+            lflags.append('-flto')
+
+    pgo_stage = profile.get('pgo_stage') if profile else None
+    if pgo_stage == 'generate':
+        cflags.append('-fprofile-generate=%s' % PGO_DIR)
+        lflags.append('-fprofile-generate=%s' % PGO_DIR)
+    elif pgo_stage == 'use':
+        cflags.extend(['-fprofile-use=%s' % PGO_DIR, '-fprofile-correction'])
+        lflags.extend(['-fprofile-use=%s' % PGO_DIR, '-fprofile-correction'])
+
+    return cflags, lflags
+
+
+def set_mkspec_flags(conf_path, cflags, lflags):
+    """Replaces the optimization flags appended to a qmake .conf file, removing them if empty."""
+    if not os.path.isfile(conf_path):
+        sdk.die('ERROR: unable to set optimization flags, %s not found' % conf_path)
+
+    with open(conf_path) as conf_file:
+        contents = conf_file.read()
+
+    begin = contents.find(MKSPEC_FLAGS_BEGIN)
+    if begin != -1:
+        end = contents.find(MKSPEC_FLAGS_END, begin) + len(MKSPEC_FLAGS_END)
+        contents = contents[:begin] + contents[end:]
+
+    if cflags or lflags:
+        contents += MKSPEC_FLAGS_BEGIN
+        contents += 'QMAKE_CFLAGS += %s\n' % ' '.join(cflags)
+        contents += 'QMAKE_CXXFLAGS += %s\n' % ' '.join(cflags)
+        contents += 'QMAKE_LFLAGS += %s\n' % ' '.join(lflags)
+        contents += MKSPEC_FLAGS_END
+
+    with open(conf_path, 'w') as conf_file:
+        conf_file.write(contents)
+
+
+def set_sip_optimization_flags(profile, configure_args):
+    cflags, lflags = optimization_flags(profile)
+
+    if cflags:
+        configure_args.append('CFLAGS+=%s' % ' '.join(cflags))
+        configure_args.append('CXXFLAGS+=%s' % ' '.join(cflags))
+    if lflags:
+        configure_args.append('LFLAGS+=%s' % ' '.join(lflags))
 
 #
 # Utility methods
 #
 
 
+def sdk_python(layout):
+    """Returns the Python interpreter to run PyQt code with inside the SDK environment."""
+    # Static SDKs have PyQt linked into their own interpreter.
+    python = os.path.join(layout['bin'], STATIC_PYTHON_EXE)
+
+    return python if os.path.isfile(python) else sys.executable
+
+
 def is_qt5():
     return os.path.isdir('qtbase')
 
@@ -404,6 +956,37 @@ def make(*args):
         sdk.sh('make', '-j%s' % str(multiprocessing.cpu_count() + 1), *args)
 
 
+def qtmake(*args):
+    """Like make() but uses jom, if available, to run in parallel on Windows too."""
+    try:
+        sdk.sh('jom', '/VERSION')
+    except:
+        make(*args)
+    else:
+        sdk.sh('jom', '-j%s' % str(multiprocessing.cpu_count() + 1), *args)
+
+
+def qmake_install_args():
+    """Returns the make arguments that have qmake generated Makefiles skip unchanged files and
+    clone, instead of copy, the changed programs and libraries. Unchanged programs aren't stripped
+    again either (see support/install-program.sh and support/strip-program.sh).
+
+    Relies on GNU install, cp and bash, so it's Linux only.
+
+    """
+    if sys.platform != 'linux2':
+        return []
+
+    if not os.path.isdir(INSTALL_STAMPS_DIR):
+        os.makedirs(INSTALL_STAMPS_DIR)
+
+    return [
+        'INSTALL_FILE=install -C -m 644',
+        'INSTALL_PROGRAM=%s %s' % (INSTALL_PROGRAM_SCRIPT, INSTALL_STAMPS_DIR),
+        'STRIP=%s %s' % (STRIP_PROGRAM_SCRIPT, INSTALL_STAMPS_DIR),
+    ]
+
+
 def set_pyqt_debug_flags(debug, configure_args):
     if debug:
         if sys.platform == 'win32':
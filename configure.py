@@ -36,6 +36,7 @@ import fileinput
 import fnmatch
 import os
 import os.path
+import pipes
 import re
 import subprocess
 import sys
@@ -51,27 +52,39 @@ def main():
 
     args = parse_args()
 
-    setup(args.install_root, args.relocate)
+    environ = os.environ.copy()
+    setup(args.install_root, args.relocate, args.static)
 
-    if args.command:
-        sys.exit(subprocess.call(args.command))
+    if args.export:
+        write_activation_script(args.export, environ)
+    elif args.command:
+        if sys.platform == 'win32':
+            sys.exit(subprocess.call(args.command))
+        else:
+            # Replace this process, there's no point in keeping Python around.
+            sys.stdout.flush()
+            os.execvp(args.command[0], args.command)
     elif args.shell:
         sdk.start_subshell()
 
 
 def parse_args():
     arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-e', '--export', metavar='SCRIPT',
+                            help='write a script that activates the SDK environment (a .cmd/.bat '
+                                 'batch file or a POSIX shell script) and exit')
     arg_parser.add_argument('-q', '--no-relocate', action='store_false', dest="relocate")
     arg_parser.add_argument(
         '-r', '--install-root', type=str, default=HERE, help='SDK installation root')
     arg_parser.add_argument('-s', '--shell', action='store_false')
+    arg_parser.add_argument('-S', '--static', action='store_true', help='use the static SDK')
     arg_parser.add_argument('command', nargs='*', metavar='command',
                             help='command (with arguments) to run within the SDK environment')
 
     return arg_parser.parse_args()
 
 
-def setup(install_root, relocate=True):
+def setup(install_root, relocate=True, static=False):
     # FIXME: preserve API with existing clients but should be removed to provide a cleaner one.
     if install_root in ('static', 'dynamic'):
         print('WARNING: Legacy code-path, please update your script.')
@@ -82,7 +95,7 @@ def setup(install_root, relocate=True):
         if os.path.isdir(os.path.join(HERE, '.svn')):
             svn_update_current_platform(layout['root'])
     else:
-        layout = sdk.get_layout(sdk.platform_root(install_root))
+        layout = sdk.get_layout(sdk.platform_root(install_root, 'static' if static else 'dynamic'))
 
     if relocate:
         relocate_qt(layout)
@@ -136,6 +149,27 @@ def relocate_sip(layout):
             sys.stdout.write(line)
 
 
+def write_activation_script(path, environ):
+    """Writes the environment variables changed by setup() since environ to a script that can be
+    sourced (or called, on Windows) to enter the SDK environment without running configure.py."""
+    changed = sorted((name, value) for name, value in os.environ.items()
+                     if environ.get(name) != value)
+
+    with open(path, 'w') as script:
+        if os.path.splitext(path)[1].lower() in ('.bat', '.cmd'):
+            script.write('@echo off\n')
+            script.write('rem Generated by configure.py, call this file to activate the SDK.\n')
+            for name, value in changed:
+                # Don't let cmd expand %VARIABLES% in the values when the script is called.
+                script.write('set "%s=%s"\n' % (name, value.replace('%', '%%')))
+        else:
+            script.write('# Generated by configure.py, source this file to activate the SDK.\n')
+            for name, value in changed:
+                script.write('export %s=%s\n' % (name, pipes.quote(value)))
+
+    print('SDK activation script written to %s' % path)
+
+
 def is_setup_done():
     return 'QT_PYQT_SDK_SETUP_DONE' in os.environ
 
@@ -0,0 +1,36 @@
+#!/bin/bash
+#
+# Drop-in replacement for qmake's "install -m 755 -p SRC DEST" used by build.py.
+#
+# Installed programs and libraries are stripped after the copy, so they can't be compared with the
+# build output: instead we keep, in STAMP_DIR, a stamp with the timestamp of the source file we
+# installed last. If the source hasn't changed since, the file is left alone. Otherwise the data is
+# cloned (reflink) when the filesystem supports it, or copied; the old file is removed first, so we
+# never write through a hardlink to another file.
+#
+# Usage: install-program.sh STAMP_DIR SRC DEST
+
+stamp_dir=$1
+src=$2
+dest=$3
+
+if [ -d "$dest" ]; then
+    dest="$dest/${src##*/}"
+fi
+
+stamp="$stamp_dir/${dest//\//%}"
+
+if [ -f "$dest" ] && [ -f "$stamp" ] && ! [ "$src" -nt "$stamp" ] && ! [ "$stamp" -nt "$src" ]; then
+    exit 0
+fi
+
+# The new file must be stripped again (see strip-program.sh).
+rm -f "$stamp.stripped"
+
+cp --reflink=auto --remove-destination --preserve=mode,timestamps "$src" "$dest" || exit 1
+
+if ! [ -x "$dest" ]; then
+    chmod 755 "$dest"
+fi
+
+touch -r "$src" "$stamp"
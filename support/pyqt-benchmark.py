@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2014  Develer S.r.L.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""Small CPU benchmark of typical PyQt workloads, run inside the SDK environment.
+
+It is also the default PGO training workload of build.py. To compare two SDKs, run it with
+QT_QPA_PLATFORM=offscreen through the configure.py of each one:
+
+    python _out/configure.py python support/pyqt-benchmark.py
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+try:
+    from PyQt5 import QtCore, QtGui, QtWidgets
+    QWidgets = QtWidgets
+except ImportError:
+    from PyQt4 import QtCore, QtGui
+    QWidgets = QtGui
+
+
+class Emitter(QtCore.QObject):
+    fired = QtCore.pyqtSignal(int)
+
+
+def bench_signals():
+    emitter = Emitter()
+    received = []
+    emitter.fired.connect(received.append)
+
+    for i in range(100000):
+        emitter.fired.emit(i)
+
+
+def bench_urls():
+    for i in range(50000):
+        url = QtCore.QUrl('http://user@example.com:%d/path/%d?query=%d#frag' % (8000 + i % 100, i, i))
+        url.host()
+        url.path()
+
+
+def bench_model():
+    model = QtGui.QStandardItemModel()
+
+    for row in range(5000):
+        model.appendRow([QtGui.QStandardItem('item %d' % row), QtGui.QStandardItem(str(row))])
+
+    model.sort(0, QtCore.Qt.DescendingOrder)
+
+    for row in range(model.rowCount()):
+        model.data(model.index(row, 1))
+
+
+def bench_painting():
+    image = QtGui.QImage(512, 512, QtGui.QImage.Format_ARGB32_Premultiplied)
+    image.fill(0)
+
+    painter = QtGui.QPainter(image)
+    painter.setRenderHint(QtGui.QPainter.Antialiasing)
+
+    for i in range(5000):
+        painter.setPen(QtGui.QColor(i % 256, (i * 3) % 256, (i * 7) % 256))
+        painter.drawLine(i % 512, 0, 511 - i % 512, 511)
+        painter.drawEllipse(QtCore.QRectF(i % 400, i % 300, 100, 50))
+
+    painter.end()
+
+
+def bench_widgets():
+    for _ in range(20):
+        window = QWidgets.QWidget()
+        layout = QWidgets.QVBoxLayout(window)
+
+        for i in range(100):
+            layout.addWidget(QWidgets.QPushButton('Button %d' % i))
+
+        window.adjustSize()
+        window.deleteLater()
+
+    QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+
+
+def main():
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('-n', '--repeat', type=int, default=3, help="default: %(default)s")
+    args = args_parser.parse_args()
+
+    if QWidgets is QtGui:
+        # Qt 4 has no offscreen platform: without a display we can't create widgets.
+        gui_enabled = sys.platform != 'linux2' or 'DISPLAY' in os.environ
+        app = QWidgets.QApplication(['pyqt-benchmark'], gui_enabled)
+    else:
+        gui_enabled = True
+        app = QWidgets.QApplication(['pyqt-benchmark'])
+
+    benchmarks = [bench_signals, bench_urls, bench_model, bench_painting]
+    if gui_enabled:
+        benchmarks.append(bench_widgets)
+
+    for bench in benchmarks:
+        timings = []
+
+        for _ in range(args.repeat):
+            start = time.time()
+            bench()
+            timings.append(time.time() - start)
+
+        print('%-20s %8.3f s' % (bench.__name__[len('bench_'):], min(timings)))
+
+    del app
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2014  Develer S.r.L.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""Startup smoke benchmark, run by build.py inside the environment of a freshly built SDK.
+
+Usage: sdk-benchmark.py PyQt4|PyQt5
+
+Prints a JSON dictionary of timings (in seconds) and peak resident memory (in KiB) on stdout.
+
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import sys
+import time
+
+
+def main():
+    pyqt = sys.argv[1]
+    results = {}
+
+    start = time.time()
+    import sip  # pylint: disable=unused-variable
+    results['import_sip'] = time.time() - start
+
+    start = time.time()
+    QtCore = __import__(pyqt + '.QtCore', fromlist=['QtCore'])  # pylint: disable=unused-variable
+    results['import_qtcore'] = time.time() - start
+
+    start = time.time()
+    QtGui = __import__(pyqt + '.QtGui', fromlist=['QtGui'])
+    if pyqt == 'PyQt5':
+        QApplication = __import__('PyQt5.QtWidgets', fromlist=['QtWidgets']).QApplication
+    else:
+        QApplication = QtGui.QApplication
+    results['import_qtgui'] = time.time() - start
+
+    start = time.time()
+    if pyqt == 'PyQt5':
+        # QT_QPA_PLATFORM=offscreen is set by build.py
+        app = QApplication(['sdk-benchmark'])
+    else:
+        # Qt 4 has no offscreen platform: without a display we can only skip the GUI bits.
+        gui_enabled = sys.platform != 'linux2' or 'DISPLAY' in os.environ
+        app = QApplication(['sdk-benchmark'], gui_enabled)
+    results['create_qapplication'] = time.time() - start
+
+    start = time.time()
+    QtGui.QImageReader.supportedImageFormats()
+    results['load_plugins'] = time.time() - start
+
+    results['max_rss_kib'] = max_rss_kib()
+
+    del app
+
+    print(json.dumps(results))
+
+
+def max_rss_kib():
+    if sys.platform == 'win32':
+        import ctypes
+        import ctypes.wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', ctypes.wintypes.DWORD),
+                ('PageFaultCount', ctypes.wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+
+        return counters.PeakWorkingSetSize // 1024
+    else:
+        import resource
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        # OS X reports bytes, Linux KiB
+        return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+// Python interpreter with SIP and the PyQt modules statically linked in.
+//
+// pyqt_inittab.h is generated by build.py and lists the init functions of the
+// modules found in the static SDK.
+
+#include <Python.h>
+
+#include "pyqt_inittab.h"
+
+// Python 2 only looks for builtin modules at the top level, so we need a
+// meta_path hook to find PyQtX.QtModule in the inittab.
+static const char importer[] =
+    "import imp, sys\n"
+    "class StaticPyQtImporter(object):\n"
+    "    def find_module(self, fullname, path=None):\n"
+    "        if '.' in fullname and fullname in sys.builtin_module_names:\n"
+    "            return self\n"
+    "    def load_module(self, fullname):\n"
+    "        if fullname in sys.modules:\n"
+    "            return sys.modules[fullname]\n"
+    "        return imp.init_builtin(fullname)\n"
+    "sys.meta_path.append(StaticPyQtImporter())\n"
+    "del imp, sys, StaticPyQtImporter\n";
+
+int main(int argc, char **argv)
+{
+    for (struct _inittab *module = pyqt_inittab; module->name; ++module)
+        PyImport_AppendInittab(module->name, module->initfunc);
+
+    // Have sys.executable and sys.prefix computed from python-pyqt, not from a python on PATH.
+    Py_SetProgramName(argv[0]);
+    Py_Initialize();
+    PyRun_SimpleString(importer);
+
+    // Py_Main() won't initialize Python again.
+    return Py_Main(argc, argv);
+}
@@ -0,0 +1,23 @@
+# Links a Python interpreter against the static Qt, SIP and PyQt libraries of the SDK.
+#
+# build.py runs qmake with these variables set:
+#   PYQT_QT       Qt modules wrapped by the PyQt modules found in the SDK
+#   PYQT_LIBS     linker flags for SIP and the static PyQt modules
+#   PYTHON_INC    Python include directory
+#   PYTHON_LIBS   linker flags for Python
+
+TEMPLATE = app
+TARGET = python-pyqt
+CONFIG += console release static
+CONFIG -= app_bundle debug_and_release debug_and_release_target
+DESTDIR = $$OUT_PWD
+
+QT = $$PYQT_QT
+
+# Besides the default platform plugin, build.py runs its benchmark and PGO training offscreen.
+greaterThan(QT_MAJOR_VERSION, 4): QTPLUGIN += qoffscreen
+
+INCLUDEPATH += $$OUT_PWD $$PYTHON_INC
+SOURCES += main.cpp
+
+LIBS += $$PYQT_LIBS $$PYTHON_LIBS
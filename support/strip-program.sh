@@ -0,0 +1,23 @@
+#!/bin/bash
+#
+# Drop-in replacement for qmake's "$(STRIP) [FLAGS] DEST" used by build.py, together with
+# install-program.sh.
+#
+# Stripping is what takes most of the time when installing Qt: files already stripped by a previous
+# run, and not reinstalled since, are left alone.
+#
+# Usage: strip-program.sh STAMP_DIR [FLAGS] DEST
+
+stamp_dir=$1
+shift
+dest=${!#}
+
+stamp="$stamp_dir/${dest//\//%}.stripped"
+
+if [ -f "$dest" ] && [ -f "$stamp" ] && ! [ "$dest" -nt "$stamp" ]; then
+    exit 0
+fi
+
+strip "$@" || exit 1
+
+touch "$stamp"